@@ -1,9 +1,14 @@
 import os
 import random
 import re
+import threading
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, wraps
 
-import bleach
+import nh3
+import orjson
 import requests
 from amadeus import Client, ResponseError
 from django.conf import settings
@@ -11,8 +16,10 @@ from django.core.cache import cache
 from geopy.exc import GeocoderTimedOut, GeopyError
 from geopy.geocoders import Nominatim
 from openai import OpenAI
+from requests.adapters import HTTPAdapter
 from terradart.api_logging import log_api_failure
 from urllib.parse import quote_plus
+from urllib3.util.retry import Retry
 
 CSC_API_KEY = os.getenv("CSC_API_KEY")
 AMADEUS_CLIENT_ID = os.getenv("AMADEUS_CLIENT_ID")
@@ -25,13 +32,30 @@ LLM_BASE_URL = os.getenv("LLM_BASE_URL")
 LLM_MODEL = os.getenv("LLM_MODEL")
 
 CACHE_TIMEOUT_SECONDS = int(os.getenv("CACHE_TIMEOUT_SECONDS", "300"))
+REFERENCE_CACHE_TIMEOUT_SECONDS = int(os.getenv("REFERENCE_CACHE_TIMEOUT_SECONDS", "86400"))
+WEATHER_CACHE_TIMEOUT_SECONDS = int(os.getenv("WEATHER_CACHE_TIMEOUT_SECONDS", "300"))
 
 _geolocator = Nominatim(user_agent="terradart-api", timeout=5)
 
-_amadeus_client = None
+_http_adapter = HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=50,
+    max_retries=Retry(
+        total=2,
+        read=0,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    ),
+)
+_http_session = requests.Session()
+_http_session.mount("https://", _http_adapter)
+_http_session.mount("http://", _http_adapter)
+
 _llm_client = None
 
-_ALLOWED_HTML_TAGS = [
+_ALLOWED_HTML_TAGS = frozenset({
     "b",
     "strong",
     "i",
@@ -42,13 +66,64 @@ _ALLOWED_HTML_TAGS = [
     "ol",
     "li",
     "a",
-]
+})
 
 _ALLOWED_HTML_ATTRS = {
-    "a": ["href", "title", "rel"],
+    "a": frozenset({"href", "title", "rel"}),
 }
 
+_ALLOWED_URL_SCHEMES = frozenset({"http", "https"})
+
+_ACTIVITY_HTML_FIELDS = ("description", "shortDescription")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
 ALLOWED_SECTIONS = ("base", "summary", "weather", "viator_activities", "amadeus_activities", "places")
+ALLOWED_SECTION_SET = frozenset(ALLOWED_SECTIONS)
+
+_ACTIVITY_SECTIONS = ("viator_activities", "amadeus_activities")
+
+# One pool shared by every concurrent request in the worker process. A detail request uses up to
+# 5 workers and a region lookup up to 2, so extra concurrent requests queue here for a free worker
+_upstream_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="upstream")
+
+_inflight_lock = threading.Lock()
+_inflight_calls = {}
+
+
+# Let concurrent callers with the same arguments share one upstream call
+def _coalesce_inflight(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+        with _inflight_lock:
+            pending = _inflight_calls.get(key)
+            if pending is None:
+                _inflight_calls[key] = future = Future()
+
+        if pending is not None:
+            return pending.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exception:
+            future.set_exception(exception)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with _inflight_lock:
+                _inflight_calls.pop(key, None)
+
+    return wrapper
+
+
+def _parse_json(response):
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as exception:
+        raise requests.exceptions.JSONDecodeError(exception.msg, exception.doc, exception.pos) from exception
 
 
 def _eligible_country(country):
@@ -63,11 +138,19 @@ def _eligible_country(country):
 def _pick_country(countries):
     if not isinstance(countries, list) or not countries:
         return None
-    for _ in range(len(countries)):
-        candidate = random.choice(countries)
+
+    # Reservoir sample so every eligible country is equally likely in a single pass
+    chosen = None
+    eligible_count = 0
+    for candidate in countries:
         if _eligible_country(candidate):
-            return candidate
-    return random.choice(countries)
+            eligible_count += 1
+            if random.randrange(eligible_count) == 0:
+                chosen = candidate
+
+    if chosen is None:
+        return random.choice(countries)
+    return chosen
 
 
 def _get_cities_by_country(iso2_country_code: str):
@@ -80,14 +163,14 @@ def _get_cities_by_country(iso2_country_code: str):
         return cached
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             f"https://api.countrystatecity.in/v1/countries/{iso2_country_code}/cities",
             headers={"X-CSCAPI-KEY": CSC_API_KEY},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        data = _parse_json(response)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return data
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_cities_by_country_fetch_error", reason = str(exception),
@@ -103,14 +186,14 @@ def _get_countries_by_region(region: str):
         return {"data": cached}
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             f"https://restcountries.com/v3.1/region/{region}",
             params={"fields": "capital,name,cca2,cca3,population"},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        data = _parse_json(response)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return {"data": data}
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_countries_by_region_fetch_error", reason = str(exception),
@@ -129,14 +212,14 @@ def get_countries_all():
         return {"data": cached}
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             "https://restcountries.com/v3.1/all",
             params={"fields": "name,cca2,cca3"},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        data = _parse_json(response)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return {"data": data}
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_countries_all_fetch_error", reason=str(exception))
@@ -147,11 +230,26 @@ def get_countries_all():
         }
 
 
+class _CountryDetailsUnavailable(Exception):
+    pass
+
+
 def _get_country_details(country: str | None):
     if not country:
         return None
 
-    country = country.strip()
+    try:
+        details = _get_country_details_cached(country.strip())
+    except _CountryDetailsUnavailable:
+        return None
+
+    # Each caller gets its own top-level dict so the memoized entry can't be edited in place
+    return dict(details) if isinstance(details, dict) else details
+
+
+# Failed lookups raise instead of returning, so lru_cache only memoizes successes
+@lru_cache(maxsize=512)
+def _get_country_details_cached(country: str):
     cache_key = f"country-info:{country.lower()}"
     cached = cache.get(cache_key)
     if cached is not None:
@@ -161,22 +259,22 @@ def _get_country_details(country: str | None):
     endpoint = f"https://restcountries.com/v3.1/{'alpha' if is_code else 'name'}/{country}?fullText=true"
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             endpoint,
             params={"fields": "name,cca2,flags,region,subregion"},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _parse_json(response)
         if isinstance(data, list) and data:
             data = data[0]
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return data
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_country_details_fetch_error", reason=str(exception),
             context={"country": country, "is_code": is_code})
 
-        return None
+        raise _CountryDetailsUnavailable(country) from exception
 
 
 def _get_all_states():
@@ -189,14 +287,14 @@ def _get_all_states():
         return cached
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             "https://api.countrystatecity.in/v1/states",
             headers={"X-CSCAPI-KEY": CSC_API_KEY},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        data = _parse_json(response)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return data
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_states_all_fetch_error", reason=str(exception))
@@ -209,9 +307,15 @@ def _get_states_by_country(iso2_country_code: str):
 
     all_states = _get_all_states()
     if all_states:
-        target = iso2_country_code.lower()
-        filtered = [state for state in all_states if str(state.get("country_code", "")).lower() == target]
-        return filtered
+        return _filter_states_by_country(all_states, iso2_country_code)
+
+
+def _filter_states_by_country(all_states, iso2_country_code: str | None):
+    if not iso2_country_code or not all_states:
+        return []
+
+    target = iso2_country_code.lower()
+    return [state for state in all_states if str(state.get("country_code", "")).lower() == target]
 
 
 def get_states_by_country(iso2_country_code: str | None):
@@ -246,14 +350,14 @@ def _get_cities_by_state(iso2_country_code: str, iso2_state_code: str):
         return cached
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             f"https://api.countrystatecity.in/v1/countries/{iso2_country_code}/states/{iso2_state_code}/cities",
             headers={"X-CSCAPI-KEY": CSC_API_KEY},
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
-        cache.set(cache_key, data, timeout=CACHE_TIMEOUT_SECONDS)
+        data = _parse_json(response)
+        cache.set(cache_key, data, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
         return data
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_cities_by_state_fetch_error", reason = str(exception),
@@ -284,14 +388,25 @@ def _get_llm_client():
 
 
 def resolve_city_for_region(region: str, wants_capital: bool):
+    use_country_cities = getattr(settings, "COUNTRY_CITIES_BULK_ENABLED", False)
+
+    # The state list doesn't depend on the picked country, so fetch it alongside the region
+    all_states_future = None
+    if not wants_capital and not use_country_cities:
+        all_states_future = _upstream_executor.submit(_get_all_states)
+
     countries_result = _get_countries_by_region(region)
     if "error" in countries_result:
+        if all_states_future:
+            all_states_future.cancel()
         return countries_result
     countries = countries_result["data"]
 
     country = _pick_country(countries)
 
     if country is None:
+        if all_states_future:
+            all_states_future.cancel()
         return {
             "error": {"error": "No country data found for region", "region": region},
             "error_status": 404,
@@ -312,35 +427,55 @@ def resolve_city_for_region(region: str, wants_capital: bool):
             }
         }
 
-    states = _get_states_by_country(iso2_country_code)
-    if not isinstance(states, list) or not states:
-        return {
-            "error": {"error": "No states found for country", "country": iso2_country_code},
-            "error_status": 404,
-        }
-
     random_city = None
     state_iso2 = None
     state_name = None
 
-    # Try a few random states to find one with cities that can be geocoded
-    for _ in range(min(len(states), 5)):
-        state_choice = random.choice(states)
-        state_iso2_candidate = state_choice.get("iso2")
-        state_name_candidate = state_choice.get("name")
-        if not state_iso2_candidate:
-            continue
-
-        cities = _get_cities_by_state(iso2_country_code, state_iso2_candidate)
+    if use_country_cities:
+        # One request for the whole country; CSC doesn't report which state each city is in
+        cities = _get_cities_by_country(iso2_country_code)
         if isinstance(cities, list) and cities:
-            candidate = random.choice(cities)
-            if isinstance(candidate, dict):
-                city_name = candidate.get("name")
-                if _can_geocode(city_name, state_name_candidate, iso2_country_code):
-                    random_city = city_name
-                    state_iso2 = state_iso2_candidate
-                    state_name = state_name_candidate
-                    break
+            city_names = [
+                candidate.get("name")
+                for candidate in random.sample(cities, min(len(cities), 5))
+                if isinstance(candidate, dict)
+            ]
+            index = _first_geocodable([(city_name, None) for city_name in city_names], iso2_country_code)
+            if index is not None:
+                random_city = city_names[index]
+    else:
+        states = _filter_states_by_country(all_states_future.result(), iso2_country_code)
+        if not states:
+            return {
+                "error": {"error": "No states found for country", "country": iso2_country_code},
+                "error_status": 404,
+            }
+
+        # Try a few random states to find one with cities that can be geocoded
+        candidate_states = [
+            (state_choice.get("iso2"), state_choice.get("name"))
+            for state_choice in random.sample(states, min(len(states), 5))
+            if state_choice.get("iso2")
+        ]
+        # CSC is keyed and quota-limited, so fetch two states at a time and stop at the first hit
+        for batch_start in range(0, len(candidate_states), 2):
+            batch = candidate_states[batch_start:batch_start + 2]
+            batch_cities = _upstream_executor.map(
+                lambda candidate: _get_cities_by_state(iso2_country_code, candidate[0]),
+                batch,
+            )
+
+            picks = []
+            for (state_iso2_candidate, state_name_candidate), cities in zip(batch, batch_cities):
+                if isinstance(cities, list) and cities:
+                    candidate = random.choice(cities)
+                    if isinstance(candidate, dict):
+                        picks.append((candidate.get("name"), state_name_candidate, state_iso2_candidate))
+
+            index = _first_geocodable([(city_name, name) for city_name, name, _ in picks], iso2_country_code)
+            if index is not None:
+                random_city, state_name, state_iso2 = picks[index]
+                break
 
     if not random_city:
         random_city = capital_city
@@ -363,27 +498,36 @@ def resolve_city_for_region(region: str, wants_capital: bool):
     }
 
 
-def _sanitize_html(value):
-    if not isinstance(value, str):
+def _clean_html(value: str) -> str:
+    # Plain text has no markup or entities to sanitize
+    if "<" not in value and "&" not in value:
         return value
 
-    return bleach.clean(
+    return nh3.clean(
         value,
         tags=_ALLOWED_HTML_TAGS,
         attributes=_ALLOWED_HTML_ATTRS,
-        protocols=["http", "https"],
-        strip=True,
+        url_schemes=_ALLOWED_URL_SCHEMES,
+        link_rel=None,
     )
 
 
+def _sanitize_html(value):
+    if not isinstance(value, str):
+        return value
+
+    return _clean_html(value)
+
+
 def _sanitize_activity(activity):
     if not isinstance(activity, dict):
         return activity
 
     sanitized = dict(activity)
-    for key in ("description", "shortDescription"):
-        if key in sanitized:
-            sanitized[key] = _sanitize_html(sanitized[key])
+    for key in _ACTIVITY_HTML_FIELDS:
+        value = sanitized.get(key)
+        if isinstance(value, str):
+            sanitized[key] = _clean_html(value)
     return sanitized
 
 
@@ -398,15 +542,46 @@ def _sanitize_activities(data):
 def _normalize_cache_part(value: str | None) -> str:
     if not isinstance(value, str):
         return ""
+    return _normalize_cache_part_cached(value)
+
+
+@lru_cache(maxsize=8192)
+def _normalize_cache_part_cached(value: str) -> str:
     normalized = value.strip().lower()
     if not normalized:
         return ""
     return quote_plus(normalized)
 
 
-def _can_geocode(city: str | None, state: str | None, country_iso2: str | None) -> bool:
-    if not city:
-        return False
+def _geocodable_cache_key(city: str | None, state: str | None, country_iso2: str | None) -> str:
+    return (
+        f"geocodable:{_normalize_cache_part(city)}:{_normalize_cache_part(state)}:"
+        f"{_normalize_cache_part(country_iso2)}"
+    )
+
+
+def _first_geocodable(candidates: list[tuple[str | None, str | None]], country_iso2: str | None) -> int | None:
+    # Read every remembered result in one round-trip; only unknown candidates hit the geocoder
+    if not candidates:
+        return None
+
+    cache_keys = [_geocodable_cache_key(city, state, country_iso2) for city, state in candidates]
+    known = cache.get_many(cache_keys)
+
+    for index, cache_key in enumerate(cache_keys):
+        if candidates[index][0] and known.get(cache_key) is True:
+            return index
+
+    for index, (city, state) in enumerate(candidates):
+        if not city or cache_keys[index] in known:
+            continue
+        if _lookup_geocodable(city, state, country_iso2, cache_keys[index]):
+            return index
+
+    return None
+
+
+def _lookup_geocodable(city: str, state: str | None, country_iso2: str | None, cache_key: str) -> bool:
     parts = [city]
     if state:
         parts.append(state)
@@ -415,11 +590,15 @@ def _can_geocode(city: str | None, state: str | None, country_iso2: str | None)
     query = ", ".join(parts)
     try:
         location = _geolocator.geocode(query, country_codes=country_iso2)
-        return location is not None
     except GeopyError:
         return False
 
+    geocodable = location is not None
+    cache.set(cache_key, geocodable, timeout=REFERENCE_CACHE_TIMEOUT_SECONDS)
+    return geocodable
+
 
+@_coalesce_inflight
 def _geocode_city(city: str, state: str | None, country: str | None):
     attempts = []
     parts = [city]
@@ -434,7 +613,9 @@ def _geocode_city(city: str, state: str | None, country: str | None):
     if country and state:
         attempts.append((f"{city}, {country}", country))
 
-    attempts.append((city, None))
+    # Without a state or country the first attempt is already the bare city
+    if state or country:
+        attempts.append((city, None))
 
     for query, country_code in attempts:
         try:
@@ -462,26 +643,27 @@ def _geocode_city(city: str, state: str | None, country: str | None):
 
 
 def _get_amadeus_client():
-    global _amadeus_client
     if not getattr(settings, "AMADEUS_ENABLED", True):
         return {"disabled": True}
 
-    if _amadeus_client is not None:
-        return _amadeus_client
-
     if not AMADEUS_CLIENT_ID or not AMADEUS_CLIENT_SECRET:
         return {
             "error": {"error": "Internal Server Error"},
             "error_status": 500,
         }
 
-    _amadeus_client = Client(
-        client_id=AMADEUS_CLIENT_ID,
-        client_secret=AMADEUS_CLIENT_SECRET,
+    return _build_amadeus_client(AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET)
+
+
+@lru_cache(maxsize=None)
+def _build_amadeus_client(client_id: str, client_secret: str):
+    return Client(
+        client_id=client_id,
+        client_secret=client_secret,
     )
-    return _amadeus_client
 
 
+@_coalesce_inflight
 def _get_amadeus_activities(latitude: float, longitude: float, radius: int = 1):
     cache_key = f"activities:{latitude}:{longitude}:{radius}"
     cached = cache.get(cache_key)
@@ -535,13 +717,13 @@ def _fetch_viator_destinations():
         }
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             f"{VIATOR_BASE_URL}/destinations",
             headers=_get_viator_headers(),
             timeout=30,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _parse_json(response)
 
         destinations = data.get("destinations", [])
         cache.set(cache_key, destinations, timeout=CACHE_TIMEOUT_SECONDS)
@@ -587,7 +769,7 @@ def _search_viator_products_by_destination(destination_id: int, limit: int = 50,
         }
 
     try:
-        response = requests.post(
+        response = _http_session.post(
             f"{VIATOR_BASE_URL}/products/search",
             headers=_get_viator_headers(),
             json={
@@ -603,7 +785,7 @@ def _search_viator_products_by_destination(destination_id: int, limit: int = 50,
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _parse_json(response)
 
         products = data.get("products", [])
         return {"data": products}
@@ -618,6 +800,7 @@ def _search_viator_products_by_destination(destination_id: int, limit: int = 50,
         }
 
 
+@_coalesce_inflight
 def _get_viator_activities(latitude: float, longitude: float, limit: int = 50, currency: str = "USD"):
     if not getattr(settings, "VIATOR_ENABLED", True):
         return {"data": []}
@@ -644,6 +827,7 @@ def _get_viator_activities(latitude: float, longitude: float, limit: int = 50, c
     return result
 
 
+@_coalesce_inflight
 def _get_places_by_coordinates(latitude: float, longitude: float, radius: int = 10):
     cache_key = f"places:v2:{latitude}:{longitude}:{radius}"
     cached = cache.get(cache_key)
@@ -665,7 +849,7 @@ def _get_places_by_coordinates(latitude: float, longitude: float, radius: int =
         radius_meters = 10000
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             "https://places-api.foursquare.com/places/search",
             params={
                 "ll": f"{latitude},{longitude}",
@@ -710,7 +894,7 @@ def _get_places_by_coordinates(latitude: float, longitude: float, radius: int =
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _parse_json(response)
         results = data.get("results", []) if isinstance(data, dict) else []
         results = [
             place for place in results
@@ -732,36 +916,63 @@ def _get_places_by_coordinates(latitude: float, longitude: float, radius: int =
 def _parse_iso(ts: str | None):
     if not ts or not isinstance(ts, str):
         return None
+    return _parse_iso_cached(ts)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso_cached(ts: str):
     try:
-        ts_norm = ts.replace("Z", "+00:00")
-        return datetime.fromisoformat(ts_norm)
+        return datetime.fromisoformat(ts)
     except Exception:
         return None
 
 
+@lru_cache(maxsize=64)
+def _parse_series(series: tuple[str, ...]):
+    return tuple(_parse_iso(ts) for ts in series)
+
+
 def _nearest_index(current_ts: str | None, series: list[str] | None):
     cur_dt = _parse_iso(current_ts)
     if not cur_dt or not isinstance(series, list) or not series:
         return None
-    best_idx = None
-    best_delta = None
-    for i, ts in enumerate(series):
-        dt = _parse_iso(ts)
-        if not dt:
-            continue
-        delta = abs((dt - cur_dt).total_seconds())
-        if best_delta is None or delta < best_delta:
-            best_delta = delta
-            best_idx = i
+
+    try:
+        parsed_series = _parse_series(tuple(series))
+    except TypeError:
+        parsed_series = [_parse_iso(ts) for ts in series]
+    return _nearest_index_parsed(cur_dt, parsed_series)
+
+
+def _nearest_index_parsed(cur_dt: datetime, parsed_series):
+    # Forecast series arrive in ascending order, so sorting is a linear pass in practice
+    parsed = sorted((dt, i) for i, dt in enumerate(parsed_series) if dt is not None)
+    if not parsed:
+        return None
+    times = [dt for dt, _ in parsed]
+
+    pos = bisect_left(times, cur_dt)
+    candidates = []
+    if pos < len(parsed):
+        candidates.append(parsed[pos])
+    if pos > 0:
+        # Earliest index among entries sharing the closest preceding timestamp
+        candidates.append(parsed[bisect_left(times, times[pos - 1])])
+
+    _, best_idx = min(candidates, key=lambda item: (abs((item[0] - cur_dt).total_seconds()), item[1]))
     return best_idx
 
 
 def _pick_indexed(series, idx):
-    if idx is not None and isinstance(series, list) and len(series) > idx:
+    if idx is None or not isinstance(series, list):
+        return None
+    try:
         return series[idx]
-    return None
+    except IndexError:
+        return None
 
 
+@_coalesce_inflight
 def _get_weather_by_coordinates(latitude: float, longitude: float):
     cache_key = f"weather:{latitude}:{longitude}"
     cached = cache.get(cache_key)
@@ -769,7 +980,7 @@ def _get_weather_by_coordinates(latitude: float, longitude: float):
         return {"data": cached}
 
     try:
-        response = requests.get(
+        response = _http_session.get(
             "https://api.open-meteo.com/v1/forecast",
             params={
                 "latitude": latitude,
@@ -804,7 +1015,7 @@ def _get_weather_by_coordinates(latitude: float, longitude: float):
             timeout=5,
         )
         response.raise_for_status()
-        data = response.json()
+        data = _parse_json(response)
 
         current = data.get("current_weather") or {}
         hourly = data.get("hourly") or {}
@@ -841,7 +1052,7 @@ def _get_weather_by_coordinates(latitude: float, longitude: float):
             }
 
         result = {"current": current_payload, "next_day": next_day, "raw": data}
-        cache.set(cache_key, result, timeout=300)
+        cache.set(cache_key, result, timeout=WEATHER_CACHE_TIMEOUT_SECONDS)
         return {"data": result}
     except requests.exceptions.RequestException as exception:
         log_api_failure("city_detail_weather_fetch_error", reason=str(exception),
@@ -854,6 +1065,7 @@ def _get_weather_by_coordinates(latitude: float, longitude: float):
         }
 
 
+@_coalesce_inflight
 def _get_city_summary(city: str, state: str | None = None, country: str | None = None):
     if not getattr(settings, "LLM_SUMMARY_ENABLED", True):
         return {"data": None}
@@ -911,7 +1123,7 @@ def _get_city_summary(city: str, state: str | None = None, country: str | None =
             message = completion.choices[0].message
             content = getattr(message, "content", None)
 
-        cleaned = re.sub(r"\s+", " ", content).strip() if isinstance(content, str) else None
+        cleaned = _WHITESPACE_RE.sub(" ", content).strip() if isinstance(content, str) else None
         cache.set(cache_key, cleaned, timeout=CACHE_TIMEOUT_SECONDS)
         return {"data": cleaned}
     except Exception as exception:
@@ -928,11 +1140,10 @@ def _get_city_summary(city: str, state: str | None = None, country: str | None =
 def get_city_detail(city: str, radius: int = 1, state: str | None = None,
     country: str | None = None, includes: list[str] | None = None):
 
-    allowed_sections = set(ALLOWED_SECTIONS)
     if includes is None:
-        include_set = allowed_sections
+        include_set = ALLOWED_SECTION_SET
     else:
-        include_set = {section for section in includes if section in allowed_sections}
+        include_set = ALLOWED_SECTION_SET.intersection(includes)
 
     cache_city = _normalize_cache_part(city)
     cache_state = _normalize_cache_part(state)
@@ -988,6 +1199,8 @@ def get_city_detail(city: str, radius: int = 1, state: str | None = None,
     if ("base" in include_set):
         response_data = {**base_data}
 
+    section_calls = {}
+
     if "summary" in include_set:
         country_for_summary = country
         country_details = base_data.get("country_details")
@@ -996,41 +1209,34 @@ def get_city_detail(city: str, radius: int = 1, state: str | None = None,
             if name_common:
                 country_for_summary = name_common
 
-        summary = _get_city_summary(city, state, country_for_summary)
-        if "error" in summary:
-            errors["summary"] = summary["error"]
-        else:
-            response_data["summary"] = summary.get("data")
+        section_calls["summary"] = (_get_city_summary, (city, state, country_for_summary))
 
     if "weather" in include_set:
-        weather = _get_weather_by_coordinates(latitude, longitude)
-        if "error" in weather:
-            errors["weather"] = weather["error"]
-        else:
-            response_data["weather"] = weather.get("data")
+        section_calls["weather"] = (_get_weather_by_coordinates, (latitude, longitude))
 
     if "viator_activities" in include_set:
-        activities = _get_viator_activities(latitude, longitude)
-        if "error" in activities:
-            errors["viator_activities"] = activities["error"]
-        else:
-            activities_data = activities.get("data")
-            response_data["viator_activities"] = _sanitize_activities(activities_data)
+        section_calls["viator_activities"] = (_get_viator_activities, (latitude, longitude))
 
     if "amadeus_activities" in include_set:
-        activities = _get_amadeus_activities(latitude, longitude, radius)
-        if "error" in activities:
-            errors["amadeus_activities"] = activities["error"]
-        else:
-            activities_data = activities.get("data")
-            response_data["amadeus_activities"] = _sanitize_activities(activities_data)
+        section_calls["amadeus_activities"] = (_get_amadeus_activities, (latitude, longitude, radius))
 
     if "places" in include_set:
-        places = _get_places_by_coordinates(latitude, longitude)
-        if "error" in places:
-            errors["places"] = places["error"]
+        section_calls["places"] = (_get_places_by_coordinates, (latitude, longitude))
+
+    # Sections are independent upstream calls, so fetch them concurrently
+    futures = {
+        section: _upstream_executor.submit(fetch, *args)
+        for section, (fetch, args) in section_calls.items()
+    }
+
+    for section, future in futures.items():
+        section_result = future.result()
+        if "error" in section_result:
+            errors[section] = section_result["error"]
+        elif section in _ACTIVITY_SECTIONS:
+            response_data[section] = _sanitize_activities(section_result.get("data"))
         else:
-            response_data["places"] = places.get("data")
+            response_data[section] = section_result.get("data")
 
     result = {"data": response_data}
     if errors:
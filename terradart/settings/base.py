@@ -11,6 +11,7 @@ VIATOR_ENABLED = False
 AMADEUS_ENABLED = False
 FOURSQUARE_ENABLED = False
 LLM_SUMMARY_ENABLED = False
+COUNTRY_CITIES_BULK_ENABLED = False
 
 CACHES = {
     "default": {
@@ -1,79 +1,166 @@
-import copy
+import contextlib
 import pytest
 from unittest.mock import MagicMock, patch
-from rest_framework.test import APIClient
+
+from city_detail import services as _services, throttles as _throttles
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only sample data")
+
+
+class _FrozenDict(dict):
+    """Dict that rejects mutation so module-level sample data can be shared."""
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+class _FrozenList(list):
+    """List that rejects mutation so module-level sample data can be shared."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = clear = extend = insert = pop = remove = reverse = sort = _immutable
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(_freeze(item) for item in value)
+    return value
 
 
 @pytest.fixture
 def api_client():
     """Django REST Framework API client."""
+    from rest_framework.test import APIClient
+
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def _clear_memoized_lookups():
+    """Reset in-process lookup memoization so tests don't share upstream data."""
+    yield
+    _services._get_country_details_cached.cache_clear()
+    _services._build_amadeus_client.cache_clear()
+
+
 @pytest.fixture
 def disable_throttling():
     """Disable throttling for tests."""
-    with patch("city_detail.throttles.BaseCityThrottle.allow_request", return_value=True):
+    with patch.object(_throttles.BaseCityThrottle, "allow_request", return_value=True):
         yield
 
 
+class _StubLocation:
+    __slots__ = ("latitude", "longitude", "address")
+
+    def __init__(self, latitude, longitude, address):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.address = address
+
+
+class _StubGeolocator:
+    """Stand-in for the Nominatim geocoder that returns a fixed location."""
+
+    __slots__ = ("_location", "calls")
+
+    def __init__(self, location):
+        self._location = location
+        self.calls = []
+
+    def geocode(self, query, **kwargs):
+        self.calls.append((query, kwargs))
+        return self._location
+
+
+@pytest.fixture(scope="session")
+def _geocoder_stub():
+    """Geocoder stub shared by the whole session; call history is reset per test."""
+    return _StubGeolocator(_StubLocation(40.7128, -74.0060, "New York, NY, USA"))
+
+
+@pytest.fixture(scope="session")
+def _geocoder_not_found_stub():
+    """Geocoder stub with no results, shared by the whole session."""
+    return _StubGeolocator(None)
+
+
+@pytest.fixture(scope="session")
+def _cache_stub():
+    """Cache mock shared by the whole session; configuration is reset per test."""
+    return MagicMock()
+
+
+def _patch_geocoder(stub):
+    stub.calls.clear()
+    return patch.object(_services, "_geolocator", new=stub)
+
+
+def _patch_cache(mock):
+    mock.reset_mock(return_value=True, side_effect=True)
+    mock.get.return_value = None
+    return patch.object(_services, "cache", new=mock)
+
+
 @pytest.fixture
-def mock_geocoder():
+def mock_geocoder(_geocoder_stub):
     """Mock the Nominatim geocoder."""
-    with patch("city_detail.services._geolocator") as mock:
-        location = MagicMock()
-        location.latitude = 40.7128
-        location.longitude = -74.0060
-        location.address = "New York, NY, USA"
-        mock.geocode.return_value = location
-        yield mock
+    with _patch_geocoder(_geocoder_stub):
+        yield _geocoder_stub
 
 
 @pytest.fixture
-def mock_geocoder_not_found():
+def mock_geocoder_not_found(_geocoder_not_found_stub):
     """Mock geocoder returning no results."""
-    with patch("city_detail.services._geolocator") as mock:
-        mock.geocode.return_value = None
-        yield mock
+    with _patch_geocoder(_geocoder_not_found_stub):
+        yield _geocoder_not_found_stub
 
 
 @pytest.fixture
-def mock_cache():
+def mock_cache(_cache_stub):
     """Mock Django cache to always miss."""
-    with patch("city_detail.services.cache") as mock:
-        mock.get.return_value = None
-        yield mock
+    with _patch_cache(_cache_stub):
+        yield _cache_stub
 
 
 @pytest.fixture
 def mock_amadeus_disabled():
     """Mock Amadeus client as disabled."""
-    with patch("city_detail.services._get_amadeus_client") as mock:
+    with patch.object(_services, "_get_amadeus_client") as mock:
         mock.return_value = {"disabled": True}
         yield mock
 
 
 @pytest.fixture
-def mock_llm_disabled():
+def mock_llm_disabled(settings):
     """Disable LLM summary generation."""
-    with patch("city_detail.services.settings") as mock:
-        mock.LLM_SUMMARY_ENABLED = False
-        mock.AMADEUS_ENABLED = False
-        mock.FOURSQUARE_ENABLED = False
-        yield mock
+    settings.LLM_SUMMARY_ENABLED = False
+    settings.AMADEUS_ENABLED = False
+    settings.FOURSQUARE_ENABLED = False
+    yield settings
+
+
+_API_KEY_ENV_VARS = (
+    "CSC_API_KEY",
+    "AMADEUS_CLIENT_ID",
+    "AMADEUS_CLIENT_SECRET",
+    "FOURSQUARE_API_KEY",
+    "LLM_API_KEY",
+)
 
 
 @pytest.fixture
 def mock_env_no_api_keys(monkeypatch):
     """Remove all API keys from environment."""
-    monkeypatch.delenv("CSC_API_KEY", raising=False)
-    monkeypatch.delenv("AMADEUS_CLIENT_ID", raising=False)
-    monkeypatch.delenv("AMADEUS_CLIENT_SECRET", raising=False)
-    monkeypatch.delenv("FOURSQUARE_API_KEY", raising=False)
-    monkeypatch.delenv("LLM_API_KEY", raising=False)
+    for key in _API_KEY_ENV_VARS:
+        monkeypatch.delenv(key, raising=False)
 
 
-_REST_COUNTRIES_DATA = [
+_REST_COUNTRIES_DATA = _freeze([
     {
         "name": {"common": "United States", "official": "United States of America"},
         "cca2": "US",
@@ -88,42 +175,42 @@ _REST_COUNTRIES_DATA = [
         "capital": ["Ottawa"],
         "population": 37742154,
     },
-]
+])
 
 
 @pytest.fixture(scope="module")
 def rest_countries_response():
     """Sample REST Countries API response."""
-    return copy.deepcopy(_REST_COUNTRIES_DATA)
+    return _REST_COUNTRIES_DATA
 
 
-_STATES_DATA = [
+_STATES_DATA = _freeze([
     {"id": 1, "name": "California", "iso2": "CA", "country_code": "US"},
     {"id": 2, "name": "New York", "iso2": "NY", "country_code": "US"},
     {"id": 3, "name": "Texas", "iso2": "TX", "country_code": "US"},
-]
+])
 
 
 @pytest.fixture(scope="module")
 def states_response():
     """Sample states API response."""
-    return copy.deepcopy(_STATES_DATA)
+    return _STATES_DATA
 
 
-_CITIES_DATA = [
+_CITIES_DATA = _freeze([
     {"id": 1, "name": "Los Angeles"},
     {"id": 2, "name": "San Francisco"},
     {"id": 3, "name": "San Diego"},
-]
+])
 
 
 @pytest.fixture(scope="module")
 def cities_response():
     """Sample cities API response."""
-    return copy.deepcopy(_CITIES_DATA)
+    return _CITIES_DATA
 
 
-_WEATHER_DATA = {
+_WEATHER_DATA = _freeze({
     "current_weather": {
         "time": "2025-01-06T12:00",
         "temperature": 45.0,
@@ -150,16 +237,16 @@ _WEATHER_DATA = {
         "precipitation_probability_max": [10, 30],
         "weathercode": [0, 1],
     },
-}
+})
 
 
 @pytest.fixture(scope="module")
 def weather_response():
     """Sample OpenMeteo weather response."""
-    return copy.deepcopy(_WEATHER_DATA)
+    return _WEATHER_DATA
 
 
-_FOURSQUARE_DATA = {
+_FOURSQUARE_DATA = _freeze({
     "results": [
         {
             "fsq_place_id": "abc123",
@@ -186,39 +273,65 @@ _FOURSQUARE_DATA = {
             "veracity_rating": 3,
         },
     ]
-}
+})
 
 
 @pytest.fixture(scope="module")
 def foursquare_response():
     """Sample Foursquare Places API response."""
-    return copy.deepcopy(_FOURSQUARE_DATA)
+    return _FOURSQUARE_DATA
 
 
-_COUNTRIES_ALL_DATA = [
+_COUNTRIES_ALL_DATA = _freeze([
     {"name": {"common": "United States"}, "cca2": "US", "cca3": "USA"},
     {"name": {"common": "Canada"}, "cca2": "CA", "cca3": "CAN"},
     {"name": {"common": "Mexico"}, "cca2": "MX", "cca3": "MEX"},
-]
+])
 
 
 @pytest.fixture(scope="module")
 def countries_all_response():
     """Sample response for all countries endpoint."""
-    return copy.deepcopy(_COUNTRIES_ALL_DATA)
+    return _COUNTRIES_ALL_DATA
 
 
-@pytest.fixture
-def mock_all_external_services(mock_geocoder, mock_cache, mock_llm_disabled):
-    """Combined fixture for fully isolated tests with all external services mocked."""
-    yield {
-        "geocoder": mock_geocoder,
-        "cache": mock_cache,
-        "settings": mock_llm_disabled,
-    }
+_EXTERNAL_SERVICE_MARKERS = frozenset({"mock_geocoder", "mock_cache", "mock_llm"})
+_EXTERNAL_SERVICE_MARKERS_KEY = pytest.StashKey[frozenset]()
+
+
+def pytest_collection_modifyitems(config, items):
+    for item in items:
+        markers = {marker.name for marker in item.iter_markers()} & _EXTERNAL_SERVICE_MARKERS
+        item.stash[_EXTERNAL_SERVICE_MARKERS_KEY] = frozenset(markers)
+
+
+@pytest.fixture(autouse=True)
+def external_service_mocks(request):
+    """Mock only the external services a test opts into via markers."""
+    markers = request.node.stash.get(_EXTERNAL_SERVICE_MARKERS_KEY, frozenset())
+    if not markers:
+        yield {}
+        return
+
+    mocks = {}
+    with contextlib.ExitStack() as stack:
+        if "mock_geocoder" in markers:
+            geocoder = request.getfixturevalue("_geocoder_stub")
+            stack.enter_context(_patch_geocoder(geocoder))
+            mocks["geocoder"] = geocoder
+
+        if "mock_cache" in markers:
+            cache = request.getfixturevalue("_cache_stub")
+            stack.enter_context(_patch_cache(cache))
+            mocks["cache"] = cache
+
+        if "mock_llm" in markers:
+            mocks["settings"] = request.getfixturevalue("mock_llm_disabled")
+
+        yield mocks
 
 
-_VIATOR_DESTINATIONS_DATA = {
+_VIATOR_DESTINATIONS_DATA = _freeze({
     "destinations": [
         {
             "destinationId": 562,
@@ -253,16 +366,16 @@ _VIATOR_DESTINATIONS_DATA = {
             "center": {"latitude": 37.0902, "longitude": -95.7129},
         },
     ],
-}
+})
 
 
 @pytest.fixture(scope="module")
 def viator_destinations_response():
     """Sample Viator destinations API response."""
-    return copy.deepcopy(_VIATOR_DESTINATIONS_DATA)
+    return _VIATOR_DESTINATIONS_DATA
 
 
-_VIATOR_PRODUCTS_DATA = {
+_VIATOR_PRODUCTS_DATA = _freeze({
     "products": [
         {
             "productCode": "12345P1",
@@ -281,10 +394,10 @@ _VIATOR_PRODUCTS_DATA = {
             "reviewCount": 500,
         },
     ],
-}
+})
 
 
 @pytest.fixture(scope="module")
 def viator_products_response():
     """Sample Viator products search API response."""
-    return copy.deepcopy(_VIATOR_PRODUCTS_DATA)
+    return _VIATOR_PRODUCTS_DATA
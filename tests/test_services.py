@@ -1,10 +1,71 @@
+import re
+import threading
+from concurrent.futures import Future
+
 import pytest
 import responses
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 from city_detail import services
 
 
+class TestCoalesceInflight:
+    """Tests for _coalesce_inflight decorator."""
+
+    def test_concurrent_callers_share_one_call(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        @services._coalesce_inflight
+        def fetch(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return {"value": value}
+
+        original_result = Future.result
+
+        def result_after_release(future, timeout=None):
+            # Only a follower waits on the shared future; let the leader finish once one does
+            release.set()
+            return original_result(future, timeout)
+
+        leader = threading.Thread(target=fetch, args=(1,))
+        leader.start()
+        started.wait(5)
+
+        with patch.object(Future, "result", result_after_release):
+            result = fetch(1)
+        leader.join(5)
+
+        assert result == {"value": 1}
+        assert calls == [1]
+
+    def test_sequential_calls_are_not_shared(self):
+        calls = []
+
+        @services._coalesce_inflight
+        def fetch(value):
+            calls.append(value)
+            return value
+
+        assert fetch(1) == 1
+        assert fetch(1) == 1
+        assert calls == [1, 1]
+        assert services._inflight_calls == {}
+
+    def test_leader_error_is_raised(self):
+        @services._coalesce_inflight
+        def fetch():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            fetch()
+        assert services._inflight_calls == {}
+
+
 class TestEligibleCountry:
     """Tests for _eligible_country helper function."""
 
@@ -41,6 +102,21 @@ class TestPickCountry:
         result = services._pick_country(countries)
         assert result in countries
 
+    def test_always_picks_eligible_country(self):
+        empty = {"name": "Empty", "population": 0}
+        populated = {"name": "Populated", "population": 100}
+        for countries in ([empty, populated], [populated, empty]):
+            for _ in range(50):
+                assert services._pick_country(countries) is populated
+
+    def test_falls_back_when_no_country_is_eligible(self):
+        countries = [
+            {"name": "A", "population": 0},
+            {"name": "B", "population": -1},
+        ]
+        for _ in range(20):
+            assert services._pick_country(countries) in countries
+
     def test_empty_list_returns_none(self):
         assert services._pick_country([]) is None
 
@@ -209,6 +285,37 @@ class TestGetCountriesAll:
         assert "error" in result
         assert result["error_status"] == 404
 
+    @responses.activate
+    def test_retries_transient_upstream_error(self, mock_cache, countries_all_response):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/all",
+            status=503,
+        )
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/all",
+            json=countries_all_response,
+            status=200,
+        )
+
+        result = services.get_countries_all()
+        assert result["data"] == countries_all_response
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_gives_up_after_retries_exhausted(self, mock_cache):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/all",
+            status=503,
+            headers={"Retry-After": "120"},
+        )
+
+        result = services.get_countries_all()
+        assert result["error_status"] == 503
+        assert len(responses.calls) == 3
+
     @responses.activate
     def test_caches_successful_response(self, mock_cache, countries_all_response):
         responses.add(
@@ -461,31 +568,58 @@ class TestSanitizeActivities:
         assert services._sanitize_activities(None) is None
 
 
-class TestCanGeocode:
-    """Tests for _can_geocode function."""
+class TestLookupGeocodable:
+    """Tests for _lookup_geocodable function."""
 
-    def test_returns_true_when_location_found(self, mock_geocoder):
-        result = services._can_geocode("New York", "NY", "US")
+    def test_stores_hit_under_geocodable_key(self, mock_geocoder, mock_cache):
+        cache_key = services._geocodable_cache_key("New York", "NY", "US")
+        result = services._lookup_geocodable("New York", "NY", "US", cache_key)
         assert result is True
+        assert [query for query, _ in mock_geocoder.calls] == ["New York, NY, US"]
+        mock_cache.set.assert_called_once_with(cache_key, True, timeout=services.REFERENCE_CACHE_TIMEOUT_SECONDS)
 
-    def test_returns_false_when_location_not_found(self, mock_geocoder_not_found):
-        result = services._can_geocode("NonexistentCity", None, None)
-        assert result is False
-
-    def test_returns_false_for_empty_city(self):
-        result = services._can_geocode("", None, None)
-        assert result is False
-
-    def test_returns_false_for_none_city(self):
-        result = services._can_geocode(None, None, None)
+    def test_returns_false_when_location_not_found(self, mock_geocoder_not_found, mock_cache):
+        cache_key = services._geocodable_cache_key("NonexistentCity", None, None)
+        result = services._lookup_geocodable("NonexistentCity", None, None, cache_key)
         assert result is False
+        mock_cache.set.assert_called_once_with(cache_key, False, timeout=services.REFERENCE_CACHE_TIMEOUT_SECONDS)
 
-    def test_returns_false_on_geocoder_error(self):
+    def test_geocoder_error_is_not_cached(self, mock_cache):
         from geopy.exc import GeocoderTimedOut
+        cache_key = services._geocodable_cache_key("TestCity", None, None)
         with patch("city_detail.services._geolocator") as mock:
             mock.geocode.side_effect = GeocoderTimedOut("timeout")
-            result = services._can_geocode("TestCity", None, None)
+            result = services._lookup_geocodable("TestCity", None, None, cache_key)
         assert result is False
+        mock_cache.set.assert_not_called()
+
+
+class TestFirstGeocodable:
+    """Tests for _first_geocodable function."""
+
+    def test_prefers_cached_hit_without_geocoding(self, mock_geocoder, mock_cache):
+        cached_key = services._geocodable_cache_key("Austin", "Texas", "US")
+        mock_cache.get_many.return_value = {cached_key: True}
+        index = services._first_geocodable([("Fresno", "California"), ("Austin", "Texas")], "US")
+        assert index == 1
+        assert mock_geocoder.calls == []
+
+    def test_skips_cached_misses(self, mock_geocoder, mock_cache):
+        missed_key = services._geocodable_cache_key("Nowhere", "Texas", "US")
+        mock_cache.get_many.return_value = {missed_key: False}
+        index = services._first_geocodable([("Nowhere", "Texas"), ("Austin", "Texas")], "US")
+        assert index == 1
+        assert [query for query, _ in mock_geocoder.calls] == ["Austin, Texas, US"]
+        mock_cache.get.assert_not_called()
+
+    def test_skips_candidates_without_city(self, mock_geocoder, mock_cache):
+        mock_cache.get_many.return_value = {}
+        assert services._first_geocodable([("", None), (None, "Texas")], "US") is None
+        assert mock_geocoder.calls == []
+
+    def test_returns_none_when_nothing_geocodes(self, mock_geocoder_not_found, mock_cache):
+        mock_cache.get_many.return_value = {}
+        assert services._first_geocodable([("Nowhere", None)], "US") is None
 
 
 class TestGetCountryDetails:
@@ -539,6 +673,55 @@ class TestGetCountryDetails:
         result = services._get_country_details("XX")
         assert result is None
 
+    @responses.activate
+    def test_repeat_lookup_is_memoized(self, mock_cache):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/US",
+            json={"name": {"common": "United States"}, "cca2": "US"},
+            status=200,
+        )
+
+        first = services._get_country_details("US")
+        second = services._get_country_details("US")
+
+        assert first == second
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_failed_lookup_is_retried(self, mock_cache):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/US",
+            json={"message": "Not Found"},
+            status=404,
+        )
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/US",
+            json={"name": {"common": "United States"}, "cca2": "US"},
+            status=200,
+        )
+
+        assert services._get_country_details("US") is None
+        result = services._get_country_details("US")
+
+        assert result["cca2"] == "US"
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_callers_cannot_modify_memoized_result(self, mock_cache):
+        responses.add(
+            responses.GET,
+            "https://restcountries.com/v3.1/alpha/US",
+            json={"name": {"common": "United States"}, "cca2": "US"},
+            status=200,
+        )
+
+        services._get_country_details("US")["cca2"] = "XX"
+
+        assert services._get_country_details("US")["cca2"] == "US"
+
     @responses.activate
     def test_looks_up_by_name_for_longer_strings(self, mock_cache):
         country_data = {
@@ -641,8 +824,6 @@ class TestGetAmadeusClient:
         assert result == {"disabled": True}
 
     def test_returns_error_without_credentials(self):
-        # Reset the cached client
-        services._amadeus_client = None
         with patch.object(services.settings, "AMADEUS_ENABLED", True), \
              patch("city_detail.services.AMADEUS_CLIENT_ID", None), \
              patch("city_detail.services.AMADEUS_CLIENT_SECRET", None):
@@ -651,7 +832,6 @@ class TestGetAmadeusClient:
         assert result["error_status"] == 500
 
     def test_creates_client_with_credentials(self):
-        services._amadeus_client = None
         with patch.object(services.settings, "AMADEUS_ENABLED", True), \
              patch("city_detail.services.AMADEUS_CLIENT_ID", "test-id"), \
              patch("city_detail.services.AMADEUS_CLIENT_SECRET", "test-secret"), \
@@ -662,7 +842,6 @@ class TestGetAmadeusClient:
                 client_id="test-id",
                 client_secret="test-secret",
             )
-        services._amadeus_client = None  # Reset for other tests
 
 
 @pytest.mark.integration
@@ -683,8 +862,7 @@ class TestGetAmadeusActivities:
         assert result["error_status"] == 500
 
     def test_returns_activities_on_success(self, mock_cache):
-        mock_response = MagicMock()
-        mock_response.data = [{"name": "Tour A"}, {"name": "Tour B"}]
+        mock_response = SimpleNamespace(data=[{"name": "Tour A"}, {"name": "Tour B"}])
 
         mock_client = MagicMock()
         mock_client.shopping.activities.get.return_value = mock_response
@@ -790,22 +968,22 @@ class TestGetPlacesByCoordinatesApiPath:
 class TestGetCitySummaryLlmPath:
     """Tests for _get_city_summary LLM call path."""
 
-    def test_returns_error_without_api_key(self, mock_cache):
+    def test_returns_error_without_api_key(self, mock_cache, monkeypatch):
+        monkeypatch.setattr(services, "_llm_client", None)
         with patch.object(services.settings, "LLM_SUMMARY_ENABLED", True), \
              patch("city_detail.services.LLM_API_KEY", None):
-            services._llm_client = None  # Reset cached client
             result = services._get_city_summary("New York", "NY", "US")
 
         assert "error" in result
         assert result["error_status"] == 500
 
     def test_returns_summary_on_success(self, mock_cache):
-        mock_completion = MagicMock()
-        mock_completion.choices = [MagicMock()]
-        mock_completion.choices[0].message.content = "New York is a major city."
-
-        mock_client = MagicMock()
-        mock_client.chat.completions.create.return_value = mock_completion
+        mock_completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="New York is a major city."))]
+        )
+        mock_client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: mock_completion))
+        )
 
         with patch.object(services.settings, "LLM_SUMMARY_ENABLED", True), \
              patch("city_detail.services._get_llm_client") as mock_get_client:
@@ -835,9 +1013,7 @@ class TestGetCitySummaryLlmPath:
         assert result == {"data": "Cached summary text"}
 
     def test_includes_country_name_in_prompt(self, mock_cache):
-        mock_completion = MagicMock()
-        mock_completion.choices = [MagicMock()]
-        mock_completion.choices[0].message.content = "Summary"
+        mock_completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Summary"))])
 
         mock_client = MagicMock()
         mock_client.chat.completions.create.return_value = mock_completion
@@ -883,32 +1059,54 @@ class TestResolveCityForRegionRandomPath:
         )
         responses.add(
             responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/CA/cities",
+            re.compile(r"https://api\.countrystatecity\.in/v1/countries/US/states/\w+/cities"),
             json=cities_response,
             status=200,
         )
+
+        with patch("city_detail.services.CSC_API_KEY", "test-key"), \
+             patch("city_detail.services._lookup_geocodable") as mock_geocode:
+            mock_geocode.return_value = True
+            result = services.resolve_city_for_region("americas", wants_capital=False)
+
+        assert "data" in result
+        assert result["data"]["region"] == "americas"
+        assert result["data"]["city"] is not None
+        assert result["data"]["iso2_country_code"] == "US"
+        # The first batch of two states already yields a geocodable city
+        assert sum("/cities" in call.request.url for call in responses.calls) == 2
+
+    @responses.activate
+    def test_uses_country_cities_when_bulk_enabled(self, settings, mock_cache, cities_response):
+        settings.COUNTRY_CITIES_BULK_ENABLED = True
+        single_country = [{
+            "name": {"common": "United States"},
+            "cca2": "US",
+            "cca3": "USA",
+            "capital": ["Washington, D.C."],
+            "population": 331002651,
+        }]
         responses.add(
             responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/NY/cities",
-            json=cities_response,
+            "https://restcountries.com/v3.1/region/americas",
+            json=single_country,
             status=200,
         )
         responses.add(
             responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/TX/cities",
+            "https://api.countrystatecity.in/v1/countries/US/cities",
             json=cities_response,
             status=200,
         )
 
         with patch("city_detail.services.CSC_API_KEY", "test-key"), \
-             patch("city_detail.services._can_geocode") as mock_geocode:
+             patch("city_detail.services._lookup_geocodable") as mock_geocode:
             mock_geocode.return_value = True
             result = services.resolve_city_for_region("americas", wants_capital=False)
 
-        assert "data" in result
-        assert result["data"]["region"] == "americas"
-        assert result["data"]["city"] is not None
-        assert result["data"]["iso2_country_code"] == "US"
+        assert result["data"]["city"] in {city["name"] for city in cities_response}
+        assert result["data"]["state_name"] is None
+        assert not any("/states" in call.request.url for call in responses.calls)
 
     @responses.activate
     def test_falls_back_to_capital_when_no_cities_geocode(self, mock_cache, states_response):
@@ -934,25 +1132,13 @@ class TestResolveCityForRegionRandomPath:
         )
         responses.add(
             responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/CA/cities",
+            re.compile(r"https://api\.countrystatecity\.in/v1/countries/US/states/\w+/cities"),
             json=[{"name": "Test City"}],
             status=200,
         )
-        responses.add(
-            responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/NY/cities",
-            json=[{"name": "Test City 2"}],
-            status=200,
-        )
-        responses.add(
-            responses.GET,
-            "https://api.countrystatecity.in/v1/countries/US/states/TX/cities",
-            json=[{"name": "Test City 3"}],
-            status=200,
-        )
 
         with patch("city_detail.services.CSC_API_KEY", "test-key"), \
-             patch("city_detail.services._can_geocode") as mock_geocode:
+             patch("city_detail.services._lookup_geocodable") as mock_geocode:
             mock_geocode.return_value = False  # No city can be geocoded
             result = services.resolve_city_for_region("americas", wants_capital=False)
 
@@ -1095,6 +1281,18 @@ class TestGeocodeCityFallbacks:
         assert "error" in result
         assert result["error_status"] == 404
 
+    def test_bare_city_is_tried_once(self, mock_geocoder_not_found):
+        result = services._geocode_city("Nowhere", None, None)
+
+        assert result["error_status"] == 404
+        assert len(mock_geocoder_not_found.calls) == 1
+
+    def test_state_and_country_try_three_queries(self, mock_geocoder_not_found):
+        services._geocode_city("Nowhere", "Texas", "US")
+
+        queries = [query for query, _ in mock_geocoder_not_found.calls]
+        assert queries == ["Nowhere, Texas, US", "Nowhere, US", "Nowhere"]
+
 
 class TestAllowedSections:
     """Tests for ALLOWED_SECTIONS constant."""
@@ -1103,6 +1301,9 @@ class TestAllowedSections:
         expected = {"base", "summary", "weather", "viator_activities", "amadeus_activities", "places"}
         assert set(services.ALLOWED_SECTIONS) == expected
 
+    def test_section_set_matches_sections(self):
+        assert services.ALLOWED_SECTION_SET == frozenset(services.ALLOWED_SECTIONS)
+
 
 class TestGetViatorHeaders:
     """Tests for _get_viator_headers function."""
@@ -115,6 +115,7 @@ class TestGetCitiesForStateEndpoint:
 
 
 @pytest.mark.integration
+@pytest.mark.xdist_group(name="TestGetCityFromRegionEndpoint")
 class TestGetCityFromRegionEndpoint:
     """Tests for /get-city/region/<region>/ endpoint."""
 
@@ -147,6 +148,8 @@ class TestGetCityFromRegionEndpoint:
 
 
 @pytest.mark.integration
+@pytest.mark.mock_llm
+@pytest.mark.xdist_group(name="TestGetCityDetailEndpoint")
 class TestGetCityDetailEndpoint:
     """Tests for /get-city-detail/<city>/ endpoint."""
 
@@ -175,12 +178,8 @@ class TestGetCityDetailEndpoint:
 
         with patch("city_detail.services._geolocator") as mock_geo:
             mock_geo.geocode.return_value = mock_location
-            with patch("city_detail.services.settings") as mock_settings:
-                mock_settings.LLM_SUMMARY_ENABLED = False
-                mock_settings.AMADEUS_ENABLED = False
-                mock_settings.FOURSQUARE_ENABLED = False
 
-                response = api_client.get("/get-city-detail/NewYork/?includes=base,weather")
+            response = api_client.get("/get-city-detail/NewYork/?includes=base,weather")
 
         assert response.status_code == 200
         data = response.json()
@@ -198,6 +197,7 @@ class TestGetCityDetailEndpoint:
 
 
 @pytest.mark.integration
+@pytest.mark.mock_llm
 class TestResolveIncludes:
     """Tests for _resolve_includes helper in views."""
 
@@ -208,12 +208,8 @@ class TestResolveIncludes:
 
         with patch("city_detail.services._geolocator") as mock_geo:
             mock_geo.geocode.return_value = mock_location
-            with patch("city_detail.services.settings") as mock_settings:
-                mock_settings.LLM_SUMMARY_ENABLED = False
-                mock_settings.AMADEUS_ENABLED = False
-                mock_settings.FOURSQUARE_ENABLED = False
 
-                response = api_client.get("/get-city-detail/TestCity/?includes=base")
+            response = api_client.get("/get-city-detail/TestCity/?includes=base")
 
         assert response.status_code == 200
         data = response.json()["data"]